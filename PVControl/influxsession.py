@@ -0,0 +1,22 @@
+'''
+Copyright (C) 2021    Stefan Eichenberger   se_misc ... hotmail.com
+This file is part of the PVOptimize project, licensed under Gnu General Public License v3
+
+Shared requests.Session for all Influx HTTP traffic (PVForecast, SolarAnzeige and
+PVControl._logInflux). influxdb.InfluxDBClient otherwise creates one session per client;
+sharing a single one maximizes connection reuse and lets us configure retries with
+backoff in one place, so a transient network hiccup does not kill a control tick.
+'''
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+def _makeSession():
+    session = requests.Session()
+    retry   = Retry(total=3, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+    adapter = HTTPAdapter(max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return(session)
+
+influx_session = _makeSession()                                                          # pass as session= to InfluxDBClient()
@@ -15,18 +15,18 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 '''
 
-from datetime import datetime, time, timedelta
-import pytz
+from datetime import datetime, time, timedelta, timezone
 import pandas as pd
+import numpy as np
 import math
-from influxdb import DataFrameClient
+import os
+import pathlib
 
 from .pvmonitorfactory      import PVMonitorFactory
 from .wallboxfactory        import WallBoxFactory
-from .pvmodel.pvmodel       import PVModel
 from .pvforecast.pvforecast import PVForecast
 
-import pickle
+import json
 
 class PVControl():
     """
@@ -46,30 +46,34 @@ class PVControl():
         called from crontab every minute. In this mode, arguments are left to default and runControl()
         collects the required data directly.
     """
+    _influx_client = None                                                                # shared Influx client, created lazily in _logInflux()
+
     def __init__(self, config):
         self.config           = config
         self.Name             = "PV Controller"
+        pvc                   = self.config['PVControl']                                 # hoist section proxies for the many reads below
+        pvs                   = self.config['PVStorage']
         
-        self.phases           = self.config['PVControl'].getint('phases', 3)
-        self.I_min            = self.config['PVControl'].getfloat('I_min', None)         # minimum charge current, will be read from wallbox
-        self.I_max            = self.config['PVControl'].getfloat('I_max', None)         # maximum charge current supported by wallbox, will be read from wallbox
-        self.I_gridMax        = self.config['PVControl'].getfloat('I_gridMax', 0)        # max current we are allowed to get from grid
-        self.feedInLimit      = self.config['PVControl'].getint('feedInLimit', 99999)    # power limit (70% rule)
-        self.minSOC           = self.config['PVControl'].getfloat('minSOC', 0.05)        # minimum SOC we want to tolerate
-        self.batMinSOC        = self.config['PVStorage'].getfloat('minSOC', 0.05)        # minimum SOC supported by battery
+        self.phases           = pvc.getint('phases', 3)
+        self.I_min            = pvc.getfloat('I_min', None)                              # minimum charge current, will be read from wallbox
+        self.I_max            = pvc.getfloat('I_max', None)                              # maximum charge current supported by wallbox, will be read from wallbox
+        self.I_gridMax        = pvc.getfloat('I_gridMax', 0)                             # max current we are allowed to get from grid
+        self.feedInLimit      = pvc.getint('feedInLimit', 99999)                         # power limit (70% rule)
+        self.minSOC           = pvc.getfloat('minSOC', 0.05)                             # minimum SOC we want to tolerate
+        self.batMinSOC        = pvs.getfloat('minSOC', 0.05)                             # minimum SOC supported by battery
         if self.minSOC < self.batMinSOC: self.minSOC = self.batMinSOC
-        self.maxSOC           = self.config['PVControl'].getfloat('maxSOC', 1)           # maximum SOC we want to tolerate
-        self.minSOCCharge     = self.config['PVControl'].getfloat('minSOCCharge', self.minSOC)   # minimum SOC before PV charge starts
-        self.maxSOCCharge     = self.config['PVControl'].getfloat('maxSOCCharge', self.maxSOC)   # maximum SOC during PV charing
+        self.maxSOC           = pvc.getfloat('maxSOC', 1)                                # maximum SOC we want to tolerate
+        self.minSOCCharge     = pvc.getfloat('minSOCCharge', self.minSOC)                # minimum SOC before PV charge starts
+        self.maxSOCCharge     = pvc.getfloat('maxSOCCharge', self.maxSOC)                # maximum SOC during PV charing
 
-        self.chargeNow        = self.config['PVControl'].getboolean('chargeNow', True)   # start charging 'now' if possible
-        self.chargeStart      = self.config['PVControl'].getint('chargeStart', 0)        # Epoch (UTC) after which to start charging if possible (nowSwitch = False)
-        self.allow_Bat2EV     = self.config['PVControl'].getboolean('allow_Bat2EV', False)
+        self.chargeNow        = pvc.getboolean('chargeNow', True)                        # start charging 'now' if possible
+        self.chargeStart      = pvc.getint('chargeStart', 0)                             # Epoch (UTC) after which to start charging if possible (nowSwitch = False)
+        self.allow_Bat2EV     = pvc.getboolean('allow_Bat2EV', False)
 
         self.InverterEff      = 0.97
-        self.batCapacity      = self.config['PVStorage'].getint('batCapacity')           # battery capacity [Wh]
-        self.maxBatDischarge  = self.config['PVStorage'].getint('maxBatDischarge')       # maximum battery (dis-)charge power [W]
-        self.maxBatCharge     = self.config['PVStorage'].getint('maxBatCharge', self.maxBatDischarge/self.InverterEff)
+        self.batCapacity      = pvs.getint('batCapacity')                                # battery capacity [Wh]
+        self.maxBatDischarge  = pvs.getint('maxBatDischarge')                            # maximum battery (dis-)charge power [W]
+        self.maxBatCharge     = pvs.getint('maxBatCharge', self.maxBatDischarge/self.InverterEff)
 
         self.coeff_A          = [0.5,  1.0]                                              # coefficients for battery power allowance model
         self.coeff_B          = [0.2,  0.7]
@@ -79,9 +83,13 @@ class PVControl():
         self.pvforecast       = None
         self.wallbox          = None                                                     # hardware abstraction
         self.inverter         = None
+        self._fc_bracket      = None                                                     # cached forecast bracket (prev_ns, next_ns, end_pv_ns), epoch-ns ints
+        self._fc_pvf          = None                                                     # forecast object the bracket and column caches were computed from
 
-        self.monitorProvider  = self.config['PVControl'].get('pvmonitor', 'Kostal')      # which class provides PVMonitor?
-        self.wallboxProvider  = self.config['PVControl'].get('wallbox', 'HardyBarth')    # which class provides wallbox?
+        self.monitorProvider  = pvc.get('pvmonitor', 'Kostal')                           # which class provides PVMonitor?
+        self.wallboxProvider  = pvc.get('wallbox', 'HardyBarth')                         # which class provides wallbox?
+        self._pvFactory       = PVMonitorFactory()                                       # factories are stateless - create them once
+        self._wbFactory       = WallBoxFactory()
 
         self.I_charge         = None
         self.I_bat            = None
@@ -89,15 +97,18 @@ class PVControl():
         self.ctrlstatus       = {}
         self.sysstatus        = {}
 
+        persistFile           = pathlib.Path('./pvcontrol.json')
         try:
-            file             = open('./pvcontrol.pickle', 'rb')
-            self.persist     = pickle.load(file)
-            if not all(key in self.persist.keys() 
-                   for key in ('saved', 'ctrl_power', 'overflow_start', 'overflow_end', 'endcharge', 'charge_completed', 'calcSOC')):
-                self._initPersist()
-            pass
-        except:
-            self._initPersist()                                                          # file doesn't exist
+            if persistFile.exists():
+                self.persist  = self._deserializePersist(persistFile.read_bytes())
+            else:
+                self.persist  = None
+        except (ValueError, KeyError):                                                   # truncated or stale file
+            self.persist      = None
+        if self.persist is None or not all(key in self.persist.keys()
+               for key in ('saved', 'ctrl_power', 'overflow_start', 'overflow_end', 'endcharge', 'charge_completed', 'calcEnergy_Ws', 'clearsky_date')):
+            self._initPersist()                                                          # file doesn't exist, is unusable, or is a pre-JSON pickle
+        self._persist_data    = self._serializePersist()                                 # as loaded - to skip write in __del__ if unchanged
 
     def runControl(self, _pvstatus = None, _pvforecast = None, _carstatus = None):
         """
@@ -156,17 +167,19 @@ class PVControl():
                         lowest value for SOC sliders
         """
         self.pvforecast             = _pvforecast
-        wallbox                     = WallBoxFactory()
         if _pvstatus is None:       # --------------------------------------------------- we need get life PV status data
-            pvmonitor               = PVMonitorFactory()
-            self.inverter           = pvmonitor.getPVMonitor(self.monitorProvider, self.config)
+            if self.inverter is None:
+                self.inverter       = self._pvFactory.getPVMonitor(self.monitorProvider, self.config)
             self.pvstatus           = self.inverter.getStatus()
-            self.wallbox            = wallbox.getWallBox(self.wallboxProvider, self.config)
+            self._setPhaseVoltage()
+            if self.wallbox is None:
+                self.wallbox        = self._wbFactory.getWallBox(self.wallboxProvider, self.config)
             self.wallbox.readWB(self.persist['charge_completed'])
-            if self.wallbox.status is not None:
-                ctrl_power          = self._I_to_P(self.wallbox.status['ctrl_current'])
-                if self.I_min is None or self.I_min < self.wallbox.status['I_min']: self.I_min = self.wallbox.status['I_min']
-                if self.I_max is None or self.I_max > self.wallbox.status['I_max']: self.I_max = self.wallbox.status['I_max']
+            wbstatus                = self.wallbox.status
+            if wbstatus is not None:
+                ctrl_power          = self._I_to_P(wbstatus['ctrl_current'])
+                if self.I_min is None or self.I_min < wbstatus['I_min']: self.I_min = wbstatus['I_min']
+                if self.I_max is None or self.I_max > wbstatus['I_max']: self.I_max = wbstatus['I_max']
             else:
                 ctrl_power          = self.persist['ctrl_power']                         # fall-back
             self.currTime           = self.pvstatus.name
@@ -177,7 +190,9 @@ class PVControl():
 
         else:                       # ----------------------------------------------------- running in simulation mode
             self.pvstatus           = _pvstatus
-            self.wallbox            = wallbox.getWallBox('dummy', self.config)
+            self._setPhaseVoltage()
+            if self.wallbox is None:
+                self.wallbox        = self._wbFactory.getWallBox('dummy', self.config)
             self.wallbox.status.update(_carstatus)
             self.currTime           = self.pvstatus.name                                 # time of last PV status
             ctrl_power              = self.persist['ctrl_power'] 
@@ -186,101 +201,165 @@ class PVControl():
             active                  = False
         req_ctrl_power_prev         = self.persist['ctrl_power']                         # requested control power in previous step
 
-        self.I_min                  = self.wallbox.round_current(self.I_min)
+        self._now_ms                = int(datetime.timestamp(self.currTime)*1000)       # epoch [ms] and seconds since midnight, cached for the tick
+        self._now_sod               = self.currTime.hour*3600 + self.currTime.minute*60 + self.currTime.second
+        valid                       = self.wallbox.valid_currents()                      # currents the wallbox can actually deliver
+        self._allowed_I             = np.asarray(valid, dtype=float) if valid else None
+        self.I_min                  = self._roundCurrent(self.I_min)
         self.sysstatus['pvcontrol'] = self._getPVControl()
+        delta_t                     = 0
         if self.persist['saved'].year > 1970:
             delta_t                 = (self.currTime - self.persist['saved']).total_seconds()/60
             if delta_t > 10: self._initPersist()                                         # file is older than 10 minutes, re-inialize
-        if self.persist['calcSOC'] == 0:                                                 # after creation of persist file
-            self.persist['calcSOC'] = self.pvstatus.soc
-        elif self.pvstatus.soc  == self.maxSOC:                                          # re-calibrate at full charge
-            self.persist['calcSOC'] = self.maxSOC
-        else:                                                                            # calculate new soc based on bat_power
-            self.persist['calcSOC'] += (-self.pvstatus.bat_power*delta_t/60)/self.batCapacity
-        self.ctrlstatus['calcSOC']  = self.persist['calcSOC']
+        fastcharge                  = self._step(ctrl_power, req_ctrl_power_prev, delta_t)
 
-        self._getClearsky()                                                              # determine clearsky parameters
-        if self.chargeStart < datetime.timestamp(self.currTime)*1000: 
-            self.chargeNow = True
-        self._getI_charge(ctrl_power, req_ctrl_power_prev)                               # calculate WB charge current
-        fastcharge                       = self._manageBatCharge(ctrl_power)             # calculate max. charge battery power
-
-        self.ctrlstatus['I_charge']      = self.I_charge
-        self.ctrlstatus['I_bat']         = self.I_bat
-        self.ctrlstatus['fastcharge']    = fastcharge
-        self.persist['ctrl_power']       = self._I_to_P(self.I_charge)                   # prepare persistent data structure - will be written to file in __del__
-        self.persist['charge_completed'] = self.wallbox.status['charge_completed']
-        self.persist['saved']            = self.currTime
-        
         if active:                                                                       # actively controll wallbox
             self._logInflux()
             if self.I_max > 0:                                                           # don't control wallbox if I_max == 0
                 self.wallbox.controlWB(self.I_charge)
             if self.inverter is not None:
                 self.inverter.setBatCharge(fastcharge, self.inhibitDischarge, self.feedInLimit, self.maxBatCharge, self.maxSOC, self.minSOC)
-                del self.inverter
-        self.ctrlstatus['ctrl_power']       = self._I_to_P(self.I_charge)
         self.ctrlstatus['max_soc']          = self.maxSOC
         self.ctrlstatus['batMinSoc']        = self.batMinSOC
         self.ctrlstatus['inhibitDischarge'] = self.inhibitDischarge
         self.ctrlstatus['chargeNow']        = 1 if self.chargeNow else 0                 # GUI wants an integer
-        t                                   = self.persist['overflow_start']
-        self.ctrlstatus['overflow_start']   = (t.hour * 3600 + t.minute * 60) * 1000     # milliseconds since midnight (UTC) when overflow can start
+        self.ctrlstatus['overflow_start']   = self._overflow_start_sod * 1000           # milliseconds since midnight (UTC) when overflow can start
 
         self.sysstatus['ctrlstatus']        = self.ctrlstatus
         self.sysstatus['pvstatus']          = self.pvstatus.to_dict()
         self.sysstatus['wbstatus']          = self.wallbox.status
         return(self.sysstatus)
 
+    def _step(self, ctrl_power, req_ctrl_power_prev, delta_t):
+        """
+        Compute-only part of a controller tick: SOC integration, clearsky parameters, charge
+        current and battery charge management. Touches self.persist and self.ctrlstatus but no
+        hardware - all I/O (inverter, wallbox, Influx) stays in runControl(), which keeps this
+        method cheap to call in tight PVServer simulation loops.
+
+        Parameters
+        ----------
+            ctrl_power          : float - power currently delivered by wallbox [W]
+            req_ctrl_power_prev : float - control power requested in previous step [W]
+            delta_t             : float - minutes since the previous step (0 if unknown)
+        """
+        if self.persist['calcEnergy_Ws'] == 0:                                           # after creation of persist file
+            self.persist['calcEnergy_Ws'] = int(self.pvstatus.soc*self.batCapacity*3600)
+        elif self.pvstatus.soc  == self.maxSOC:                                          # re-calibrate at full charge
+            self.persist['calcEnergy_Ws'] = int(self.maxSOC*self.batCapacity*3600)
+        else:                                                                            # integrate bat_power; integer Ws accumulation doesn't drift
+            self.persist['calcEnergy_Ws'] += int(-self.pvstatus.bat_power*delta_t*60)
+        self.ctrlstatus['calcSOC']  = self.persist['calcEnergy_Ws']/(self.batCapacity*3600)
+
+        self._getClearsky()                                                              # determine clearsky parameters
+        t                           = self.persist['overflow_start']                     # overflow window as seconds since midnight, for int comparisons below
+        self._overflow_start_sod    = t.hour*3600 + t.minute*60 + t.second
+        t                           = self.persist['overflow_end']
+        self._overflow_end_sod      = t.hour*3600 + t.minute*60 + t.second
+        if self.chargeStart < self._now_ms:
+            self.chargeNow = True
+        self._getI_charge(ctrl_power, req_ctrl_power_prev)                               # calculate WB charge current
+        fastcharge                       = self._manageBatCharge(ctrl_power)             # calculate max. charge battery power
+
+        self.ctrlstatus['I_charge']      = self.I_charge
+        self.ctrlstatus['I_bat']         = self.I_bat
+        self.ctrlstatus['fastcharge']    = fastcharge
+        ctrl_P                           = self._I_to_P(self.I_charge)                   # computed once for persist and status reporting
+        self.ctrlstatus['ctrl_power']    = ctrl_P
+        self.persist['ctrl_power']       = ctrl_P                                        # prepare persistent data structure - will be written to file in __del__
+        self.persist['charge_completed'] = self.wallbox.status['charge_completed']
+        self.persist['saved']            = self.currTime
+        return(fastcharge)
+
     def __del__ (self):
         """
-        Distructor - main function is to write self.persist into pickle serialization file
+        Distructor - main function is to write self.persist into the JSON persistence file.
+        The file is only rewritten if self.persist actually changed, and written atomically
+        (temp file + os.replace) so that a crash cannot leave a truncated file behind.
         """
-        file                 = open('./pvcontrol.pickle', 'wb')
-        pickle.dump(self.persist, file)
+        data = self._serializePersist()
+        if data != self._persist_data:
+            with open('./pvcontrol.json.tmp', 'wb') as file:
+                file.write(data)
+            os.replace('./pvcontrol.json.tmp', './pvcontrol.json')
         pass
 
+    def _serializePersist(self):
+        """
+        Serializes self.persist to compact JSON bytes. datetime/time values are ISO encoded;
+        all other values are JSON-native already.
+        """
+        obj = dict(self.persist)
+        obj['saved']            = obj['saved'].isoformat()
+        obj['overflow_start']   = obj['overflow_start'].isoformat()
+        obj['overflow_end']     = obj['overflow_end'].isoformat()
+        obj['charge_completed'] = bool(obj['charge_completed'])
+        return(json.dumps(obj, separators=(',', ':')).encode())
+
+    def _deserializePersist(self, data):
+        """
+        Inverse of _serializePersist() - parses JSON bytes back into a persist dictionary
+        """
+        obj                   = json.loads(data)
+        obj['saved']          = datetime.fromisoformat(obj['saved'])
+        obj['overflow_start'] = time.fromisoformat(obj['overflow_start'])
+        obj['overflow_end']   = time.fromisoformat(obj['overflow_end'])
+        return(obj)
+
     def _initPersist(self):
         """
-        re-creates self.pickle from scratch, in case pickle serialization file was not found or older than 10min.
+        re-creates self.persist from scratch, in case persistence file was not found or older than 10min.
         """
-        print("pvcontrol: file pvcontrol.pickle recreated")
-        t            = datetime(1970, 1, 1, 0, 0, tzinfo=pytz.utc)
+        print("pvcontrol: file pvcontrol.json recreated")
+        t            = datetime(1970, 1, 1, 0, 0, tzinfo=timezone.utc)
         self.persist = { 'saved'            : t,                                         # time stamp of persistent data
                          'ctrl_power'       : 0,                                         # power delivered to controller in prior step (for sim, as fall-back)
                          'overflow_start'   : time(0, 0),                                # start of time period for potential 70% power limitiation
                          'overflow_end'     : time(0, 0),                                # end   of time period for potential 70% power limitation
-                         'endcharge'        : { 1 : None },                              # when can we no longer reach I = 'key'?
+                         'endcharge'        : [],                                        # seconds since midnight UTC when current I = index+1 can last be reached (-1: never)
                          'charge_completed' : 0,                                         # wallbox charging completed
-                         'calcSOC'          : 0                                          # calculated SOC
+                         'calcEnergy_Ws'    : 0,                                         # calculated battery energy content [Ws]
+                         'clearsky_date'    : 0                                          # day ordinal for which 'endcharge', 'overflow_*' were computed
                         }
 
     def _getClearsky(self):
         """
-        Uses PVModel() to calculate clear-sky estimate for the PV system and stores interesing timestamps into self.persist
-        """
-        if self.currTime.date() > self.persist['saved'].date():                          # ... new day (just after midnight UTC - assumes midnight UTC is during local night)
-            myPVSystem  = PVModel(self.config)
-            times       = pd.date_range(self.currTime.replace(hour=0, minute=0, second=0), self.currTime.replace(hour=23), freq="5min")
-            times_df    = pd.DataFrame(times).set_index(0)
-            clearsky    = myPVSystem.runModel(times_df, 'clearsky')
-            endcharge   = {}  
-            for I in range(1, math.ceil(self.I_max), 1):
-                P       = self._I_to_P(I)
-                power   = clearsky.loc[clearsky['ac_clearsky'] > P]
-                if not power.empty:                                                      # at what time do we have last time enough clearsky power to generate current I?
-                    endcharge[I] = power.iloc[-1].name.time()
-            self.persist['endcharge'] = endcharge
-            power       = clearsky.loc[clearsky['ac_clearsky'] > self.feedInLimit]       # potential overflow
-            if power.empty:                                                              # we are in winter or transition time
-                power   = clearsky.loc[clearsky['ac_clearsky'] > 0.9*self.feedInLimit]   # allow a bit of slack for overradiation days
-            if power.empty:                                                              # we are in winter
-                self.persist['overflow_start'] = time(23, 59)                                            # no power limit period
-                self.persist['overflow_end']   = time( 0,  0)
-            else:
-                self.persist['overflow_start'] = (power.iloc[0].name  - timedelta(minutes=30)).time()    # give 30min slack for over-radiation
-                self.persist['overflow_end']   = (power.iloc[-1].name + timedelta(minutes=30)).time()
-            print('power_limit for ' + str(self.currTime.date()) + ': ' + str(self.persist['overflow_start'])[0:5] + " .. " + str(self.persist['overflow_end'])[0:5])
+        Provides clear-sky derived timestamps in self.persist. On a cache hit (same day) this
+        only checks the persisted date; the actual model run happens in _computeClearsky()
+        """
+        if self.currTime.toordinal() != self.persist['clearsky_date']:                   # ... new day (just after midnight UTC - assumes midnight UTC is during local night)
+            self._computeClearsky()
+        return()
+
+    def _computeClearsky(self):
+        """
+        Uses PVModel() to calculate clear-sky estimate for the PV system and stores interesing timestamps
+        into self.persist. Kept separate from _getClearsky() so the heavy model run can also be triggered
+        outside the control tick.
+        """
+        from .pvmodel.pvmodel import PVModel                                         # deferred - pvlib import is heavy and only needed once per day
+        myPVSystem  = PVModel(self.config)
+        times       = pd.date_range(self.currTime.replace(hour=0, minute=0, second=0), self.currTime.replace(hour=23), freq="5min")
+        times_df    = pd.DataFrame(index=times)                                          # runModel only needs the index for the clearsky model
+        clearsky    = myPVSystem.runModel(times_df, 'clearsky')
+        ac          = clearsky['ac_clearsky'].to_numpy()
+        P_arr       = self._I_to_P(np.arange(1, math.ceil(self.I_max)))
+        tail_max    = np.maximum.accumulate(ac[::-1])                                # element k: max of ac[-1-k:], ascending by construction
+        last_above  = ac.size - 1 - np.searchsorted(tail_max, P_arr, side='right')   # last index with ac > P, per current; -1 if never
+        secs        = (clearsky.index.hour*3600 + clearsky.index.minute*60 + clearsky.index.second).to_numpy()
+        self.persist['endcharge'] = np.where(last_above >= 0, secs[last_above], -1).tolist()
+                                                                                     # entry I-1: last time (seconds since midnight) with enough clearsky power for current I
+        power       = clearsky.loc[clearsky['ac_clearsky'] > self.feedInLimit]       # potential overflow
+        if power.empty:                                                              # we are in winter or transition time
+            power   = clearsky.loc[clearsky['ac_clearsky'] > 0.9*self.feedInLimit]   # allow a bit of slack for overradiation days
+        if power.empty:                                                              # we are in winter
+            self.persist['overflow_start'] = time(23, 59)                                            # no power limit period
+            self.persist['overflow_end']   = time( 0,  0)
+        else:
+            self.persist['overflow_start'] = (power.iloc[0].name  - timedelta(minutes=30)).time()    # give 30min slack for over-radiation
+            self.persist['overflow_end']   = (power.iloc[-1].name + timedelta(minutes=30)).time()
+        self.persist['clearsky_date'] = self.currTime.toordinal()
+        print('power_limit for ' + str(self.currTime.date()) + ': ' + str(self.persist['overflow_start'])[0:5] + " .. " + str(self.persist['overflow_end'])[0:5])
         return()
 
     def _getI_charge(self, ctrl_power, req_ctrl_power_prev = None):
@@ -299,50 +378,56 @@ class PVControl():
         if req_ctrl_power_prev is None:
             req_ctrl_power_prev   = ctrl_power
         if self.chargeNow and self.wallbox.status['connected']:
+            dc_power              = float(self.pvstatus.dc_power)                        # hoist Series lookups out of the control math
+            home_consumption      = float(self.pvstatus.home_consumption)
+            soc                   = float(self.pvstatus.soc)
+            I_min                 = self.I_min                                           # ... same for the attributes read in several branches
+            I_gridMax             = self.I_gridMax
             I_prev                = self._P_to_I(ctrl_power)                             # what we have been charging so far
             I_prev_req            = self._P_to_I(req_ctrl_power_prev)
-            if abs(self.I_min - I_prev) < 0.1:                                           # we suffer from rounding errors
-                I_prev            = self.I_min
-            if abs(I_prev_req - I_prev) < 0.1:
+            I_prev_di             = round(I_prev*10)                                     # deciamp int - exact compares instead of float tolerance tests
+            if round(I_min*10)      == I_prev_di:                                        # we suffer from rounding errors
+                I_prev            = I_min
+            if round(I_prev_req*10) == I_prev_di:
                 I_prev_req        = I_prev
-            avail_P               = self.pvstatus.dc_power*self.InverterEff - self.pvstatus.home_consumption + ctrl_power
+            avail_P               = dc_power*self.InverterEff - home_consumption + ctrl_power
             if avail_P < 0: avail_P = 0                                                  # negative: no PV power available at all
             I_maxPV               = self._P_to_I(avail_P)
             I_missing             = 0
-            if ctrl_power > 0  and I_maxPV < self.I_min:                                 # if we can supply that much power, we are mid-way between previous and min
-                I_missing         = (I_prev + self.I_min)/2 - I_maxPV 
-            if ctrl_power == 0 and (I_maxPV + self.I_gridMax >= self.I_min or self.allow_Bat2EV):    # try to harvest battery and grid
-                I_missing         = self.I_min - I_maxPV                                 # ... at least this much we need find
+            if ctrl_power > 0  and I_maxPV < I_min:                                      # if we can supply that much power, we are mid-way between previous and min
+                I_missing         = (I_prev + I_min)/2 - I_maxPV 
+            if ctrl_power == 0 and (I_maxPV + I_gridMax >= I_min or self.allow_Bat2EV):  # try to harvest battery and grid
+                I_missing         = I_min - I_maxPV                                      # ... at least this much we need find
             if I_missing > 0:
-                if self.allow_Bat2EV and self.pvstatus.soc > self.minSOCCharge:          # allow charing EV from battery
+                if self.allow_Bat2EV and soc > self.minSOCCharge:                        # allow charing EV from battery
                     I_bat    = self._P_to_I(self.maxBatDischarge)
-                    I_charge = self.I_gridMax + I_bat + I_maxPV
+                    I_charge = I_gridMax + I_bat + I_maxPV
                 else:
                     I_bat             = self._maxFromBat(self.coeff_A)                   # current we can supply, using Coeff_A, to supply >I_min
                     if I_missing > I_bat:                                                # we don't want provide so much from the battery
-                        I_missing     = self.I_min - I_maxPV                             # if at least we can get this, we can continue with charging
+                        I_missing     = I_min - I_maxPV                                  # if at least we can get this, we can continue with charging
                         I_bat         = self._maxFromBat(self.coeff_B)                   # max. avail current based on Coeff_B to sustain I_min
-                        if I_missing > I_bat + self.I_gridMax:                           # we can't supply from battery alone, or battery plus grid allowence
+                        if I_missing > I_bat + I_gridMax:                                # we can't supply from battery alone, or battery plus grid allowence
                             I_missing = 0
-                        elif I_missing <= self.I_gridMax:                                # if grid allowence itself is sufficient
+                        elif I_missing <= I_gridMax:                                     # if grid allowence itself is sufficient
                             self.inhibitDischarge = True                                 # don't use battery
-                    elif I_missing <= self.I_gridMax:
+                    elif I_missing <= I_gridMax:
                         self.inhibitDischarge = True
-                    if self.inhibitDischarge and self.I_gridMax - I_maxPV > I_missing:
-                        I_missing = self.I_gridMax                                       # ok., let's use all grid power we can (but limit below to self.I_max)
-                    I = math.floor(self.I_min - self.I_gridMax)                          # will not be able to charge anymore without battery
-                    if I in self.persist['endcharge']:
-                        t = self.persist['endcharge'][I]
-                        if self.currTime.time() > t:
+                    if self.inhibitDischarge and I_gridMax - I_maxPV > I_missing:
+                        I_missing = I_gridMax                                            # ok., let's use all grid power we can (but limit below to self.I_max)
+                    I         = math.floor(I_min - I_gridMax)                            # will not be able to charge anymore without battery
+                    endcharge = self.persist['endcharge']
+                    if 1 <= I <= len(endcharge) and endcharge[I-1] >= 0:
+                        if self._now_sod > endcharge[I-1]:
                             I_missing = 0
                     I_charge          = I_maxPV + I_missing                              # how much we want supply - this may include some grid power
                     if I_prev > 0 and I_charge > I_prev and not self.inhibitDischarge:   # we have something missing (not feeding from grid only), still increase I_charge?
                         I_charge = I_prev                                                # .. this should only be due to rounding errors
             else:  I_charge       = I_maxPV
-            I_charge = self.wallbox.round_current(I_charge)                              # HardyBarth rounds down to full amps
+            I_charge = self._roundCurrent(I_charge)                                      # HardyBarth rounds down to full amps
 
-            if I_charge < self.I_min: 
-                if I_prev < I_prev_req: I_charge = self.I_min                            # we requested more than was consumed ... 
+            if I_charge < I_min: 
+                if I_prev < I_prev_req: I_charge = I_min                                 # we requested more than was consumed ... 
                 else:                   I_charge = 0                                     # we are below the limit which WB can deliver for charging
             if I_charge > self.I_max: I_charge = self.I_max                              # we can't charge with more current than this
             self.I_charge          = I_charge
@@ -367,20 +452,30 @@ class PVControl():
         fastcharge     = True                                                            # default if no forecast data available
 
         if self.pvforecast is not None:
+            dc_power          = float(self.pvstatus.dc_power)                            # hoist Series lookups out of the control math
+            home_consumption  = float(self.pvstatus.home_consumption)
+            soc               = float(self.pvstatus.soc)
             fastcharge = False                                                           # default if forecast data available
-            need       = (self.maxSOC - self.pvstatus.soc)*self.batCapacity              # needed energy to charge battery [kWh]
+            need       = (self.maxSOC - soc)*self.batCapacity                            # needed energy to charge battery [kWh]
             if need < 0: need = 0                                                        # .. in case maxSOC changed
             try:
-                next   = self.pvforecast[self.pvforecast['period_end'] >= self.currTime].iloc[0]   # this gives forecast for the next forecast time stamp
-                prev   = self.pvforecast.loc[next.name + 1]                              # this gives forecast for the previous forecast time stamp ('name' was index value in data frame)
-                dt     = next['period_end'] - prev['period_end']                         # interval duration
-                now    = self.currTime - prev['period_end']
-                dP     = next['remain'] - prev['remain']                                 # remaining power loss during interval
-                have   = prev['remain'] + dP*now/dt                                      # how much power do we have right now?
-                end_pv = self.pvforecast[self.pvforecast['remain'] < 100].iloc[0]['period_end']
-                dt_pv  = (end_pv - self.currTime).total_seconds()/3600                   # how long do we still have PV power? [h]
+                if self._fc_pvf is not self.pvforecast:                                  # new forecast - refresh cached NumPy columns
+                    self._pvf_ends   = self.pvforecast['period_end'].values.astype('datetime64[ns]').view('i8')
+                    self._pvf_remain = self.pvforecast['remain'].to_numpy(np.float64)    # monotone decreasing
+                    self._fc_bracket = None
+                    self._fc_pvf     = self.pvforecast
+                now_ns = pd.Timestamp(self.currTime).value
+                if self._fc_bracket is None or not (self._fc_bracket[0] <= now_ns < self._fc_bracket[1]):
+                    i      = int(np.searchsorted(self._pvf_ends, now_ns, side='left'))   # 'period_end' is sorted - binary search instead of boolean mask
+                    if i == 0 or i >= self._pvf_ends.size:
+                        raise IndexError('no forecast bracket for ' + str(self.currTime))
+                    j      = self._pvf_remain.size - int(np.searchsorted(self._pvf_remain[::-1], 100, side='left'))
+                    self._fc_bracket = (int(self._pvf_ends[i-1]), int(self._pvf_ends[i]), int(self._pvf_ends[j]))
+                end_pv_ns = self._fc_bracket[2]                                          # when does PV power essentially end?
+                have   = float(np.interp(now_ns, self._pvf_ends, self._pvf_remain))      # how much power do we have right now?
+                dt_pv  = (end_pv_ns - now_ns)/3.6e12                                     # how long do we still have PV power? [h]
                 if dt_pv < 0: dt_pv = 0                                                  # ... for if we are past sunset
-                home   = self.pvstatus.home_consumption - ctrl_power                     # current home consumption (without what goes to wallbox), [W]
+                home   = home_consumption - ctrl_power                                   # current home consumption (without what goes to wallbox), [W]
                 have   = have - home*dt_pv                                               # subtract home consumption (at current level) from available PV forecast
                 if have < 0: have = 0
             except Exception:
@@ -393,22 +488,22 @@ class PVControl():
 
             if not (self.allow_Bat2EV and self.wallbox.status['connected'] and self.I_charge > 0 and not self.wallbox.status['charge_completed']):
                                                                                          # if we allow_Bat2EV and are connected, can supply current and are not completed, we don't allow fastcharge
-                if self.pvstatus.dc_power > self.feedInLimit/50:                         # we have some PV power ...
+                if dc_power > self.feedInLimit/50:                                       # we have some PV power ...
                     if need > have/self.coeff_C[0] and self.inhibitDischarge == False:   # oops - we should start focusing on battery now (unless grid charging is on)
                         fastcharge            = True
                         self.I_charge         = self.I_charge - self._P_to_I(self.maxBatCharge)                   # stop charging car
                         if self.I_charge < self.I_min: self.I_charge = 0
-                    elif self.minSOCCharge > self.pvstatus.soc:                                                   # enforce fastcharge to minSOCCharge
+                    elif self.minSOCCharge > soc:                                                                 # enforce fastcharge to minSOCCharge
                         fastcharge            = True
                         self.I_charge         = 0                                                                 # focus on bringing battery to minSOCCharge
                     elif self.wallbox.status['connected'] and not self.wallbox.status['charge_completed']:        # planning to / ongoing car charge - all surplus goes to battery
-                        if self.pvstatus.soc < self.maxSOCCharge or self.currTime.time() > self.persist['overflow_end']: 
+                        if soc < self.maxSOCCharge or self._now_sod > self._overflow_end_sod: 
                             fastcharge = True
-                        if need < have/self.coeff_C[1] and self.currTime.time() < self.persist['overflow_start']: # don't charge full yet, whilst charging car
+                        if need < have/self.coeff_C[1] and self._now_sod < self._overflow_start_sod:                 # don't charge full yet, whilst charging car
                             self.maxSOC       = self.maxSOCCharge
-                    elif need > have/self.coeff_C[1] and self.currTime.time() < self.persist['overflow_end']:     # still early, but not that much more energy left ...
+                    elif need > have/self.coeff_C[1] and self._now_sod < self._overflow_end_sod:                     # still early, but not that much more energy left ...
                         fastcharge            = True
-                    elif self.currTime.time() > self.persist['overflow_end']:            # afternoon - charge battery now without further condition
+                    elif self._now_sod > self._overflow_end_sod:                         # afternoon - charge battery now without further condition
                         fastcharge            = True
                 else:   fastcharge            = True                                     # ... if we are here, we probably won't load battery anyway, but we may at least try ...
                 if self.I_charge == 0: self.I_bat = 0
@@ -418,18 +513,39 @@ class PVControl():
         else:        self.ctrlstatus['bat_forecast'] = 1
         return(fastcharge)
 
+    def _setPhaseVoltage(self):
+        """
+        Cache grid_voltage * phases (and its inverse) once per tick, so that the
+        frequently called converters below don't touch the pvstatus Series each time
+        """
+        self._v_phases     = float(self.pvstatus.grid_voltage) * self.phases
+        self._inv_v_phases = 1.0 / self._v_phases
+
+    def _roundCurrent(self, I):
+        """
+        Round charge current I down to the next value the wallbox can actually deliver, using
+        the pre-computed self._allowed_I vector with a single searchsorted(). Values below the
+        smallest allowed current (or an unknown allowed set) fall back to wallbox.round_current(),
+        so that the I_min / I_max clamping downstream sees the same values as before.
+        """
+        if self._allowed_I is not None:
+            idx = int(np.searchsorted(self._allowed_I, I, side='right')) - 1
+            if idx >= 0:
+                return(float(self._allowed_I[idx]))                                      # plain float - np.float64 must not leak into status/persist
+        return(self.wallbox.round_current(I))
+
     def _P_to_I(self, P):
         """
         Convert AC power to current (per phase)
         """
-        I = P / (self.pvstatus.grid_voltage * self.phases)
+        I = P * self._inv_v_phases
         return(I)
 
     def _I_to_P(self, I):
         """
         Convert current (per phase) to AC power
         """
-        P = I * self.pvstatus.grid_voltage * self.phases
+        P = I * self._v_phases
         return(P)
 
     def _maxFromBat(self, coeff):
@@ -437,16 +553,12 @@ class PVControl():
         determines how much battery power we want to use for EV charging. This is a function of
         some coefficients 'coeff' and depends on current battery SOC.
         """
+        soc       = float(self.pvstatus.soc)
+        if soc <= self.minSOCCharge:                                                     # nothing to give - skip the line equation
+            return(0)
         I_batMax  = self._P_to_I(self.maxBatDischarge)
         a         = I_batMax/(coeff[1]-coeff[0])
-        b         = -a*coeff[0]
-        if self.pvstatus.soc > self.minSOCCharge:
-            I_bat = self.pvstatus.soc*a+b                                                # max. avail current based on coeff. a1, a2 to slowly reduce charing
-            if I_bat < 0:        I_bat = 0
-            if I_bat > I_batMax: I_bat = I_batMax
-        else:
-            I_bat = 0    
-        return(I_bat)
+        return(min(I_batMax, max(0.0, (soc - coeff[0])*a)))                              # clipped line through coeff. a1, a2 to slowly reduce charging
 
     def _logInflux(self):
         """
@@ -479,26 +591,25 @@ class PVControl():
             try:
                 inhibit  = self.config['PVControl'].getboolean('inhibitInflux', False)   # inhibit writing to Influx DB
                 if not inhibit:
-                    port     = self.config['PVControl'].getint('port', 8086)
-                    database = self.config['PVControl'].get('database')
-                    client   = DataFrameClient(host=host, port=port, database=database)
-
-                    df       = pd.DataFrame(self.wallbox.status, index = [self.currTime])
-                    df.drop(['I_min', 'I_max'], axis=1, inplace=True)
-                    for field in df:
-                        df[field] = df[field].astype(float)
-                    client.write_points(df, 'wbstatus')
-
-                    df       = pd.DataFrame(self.pvstatus.to_frame().transpose())
-                    df.drop(['minSoc'], axis=1, inplace=True)
-                    for field in df:
-                        df[field] = df[field].astype(float)
-                    client.write_points(df, 'pvstatus')
-
-                    df       = pd.DataFrame(self.ctrlstatus, index = [self.currTime])
-                    for field in df:
-                        df[field] = df[field].astype(float)
-                    client.write_points(df, 'ctrlstatus')
+                    if PVControl._influx_client is None:                                 # create client only once - underlying HTTP session is reused across ticks
+                        from influxdb import InfluxDBClient                              # deferred - only the logging path needs it
+                        from .influxsession import influx_session
+                        port     = self.config['PVControl'].getint('port', 8086)
+                        database = self.config['PVControl'].get('database')
+                        gzip     = self.config['PVControl'].getboolean('gzip', False)    # compress traffic - useful for remote Influx hosts
+                        PVControl._influx_client = InfluxDBClient(host=host, port=port, database=database, gzip=gzip, session=influx_session)
+                    client   = PVControl._influx_client
+                    points   = []                                                        # collect all three measurements, write in one request
+
+                    fields   = { k: float(v) for k, v in self.wallbox.status.items() if k not in ('I_min', 'I_max') }
+                    points.append({ 'measurement': 'wbstatus',   'time': self.currTime, 'fields': fields })
+
+                    fields   = { k: float(v) for k, v in self.pvstatus.items() if k != 'minSoc' }
+                    points.append({ 'measurement': 'pvstatus',   'time': self.currTime, 'fields': fields })
+
+                    fields   = { k: float(v) for k, v in self.ctrlstatus.items() }
+                    points.append({ 'measurement': 'ctrlstatus', 'time': self.currTime, 'fields': fields })
+                    client.write_points(points)
                     pass
             except Exception as e:
                 print('pvcontrol._logInflux: ' + str(e))
@@ -1,15 +1,21 @@
 import pandas as pd
+import numpy as np
 import sys
-from influxdb import InfluxDBClient
 from datetime import datetime, date, time, timezone, timedelta
 
 class PVForecast:
+    _influx_client = None                                                                # shared Influx client - underlying HTTP session is reused across ticks
+
     def __init__(self, config):
         self.config      = config
         self._host       = self.config['PVForecast'].get('host')
         self._port       = self.config['PVForecast'].getint('port', 8086)
         self._database   = self.config['PVForecast'].get('database')
         self.useForecast = self.config['PVForecast'].getboolean('useForecast', True)
+        self._gzip       = self.config['PVForecast'].getboolean('gzip', False)           # compress traffic - useful for remote Influx hosts
+        meas, _, field   = self.config['PVForecast'].get('forecastField', '').partition('.')   # '<measurement>.<field>', parsed once
+        self._sql        = 'SELECT "' + field + '" AS "forecast" FROM "' + meas + \
+                           '" WHERE time >= \'{}\' AND time < \'{}\' ORDER BY time DESC'
         self.forecast    = None
         self.date        = None
         pass
@@ -34,38 +40,27 @@ class PVForecast:
             if self.date != now.date():
                 startTime      = now.strftime('%Y-%m-%dT00:00:00Z')
                 endTime        = now.strftime('%Y-%m-%dT23:59:59Z')
-                meas, field    = self.config['PVForecast'].get('forecastField').split('.')
 
-                client         = InfluxDBClient(host=self._host, port=self._port, database=self._database)
-                sql            = 'SELECT "' + field +'" AS "forecast" FROM "' + meas + '" WHERE time >= ' + "'" + startTime + "' AND time < '" + endTime + "' ORDER BY time DESC"
+                if PVForecast._influx_client is None:                                # create client only once, like PVControl._logInflux does
+                    from influxdb import InfluxDBClient                              # deferred - only Influx-backed forecasts need it
+                    from ..influxsession import influx_session
+                    PVForecast._influx_client = InfluxDBClient(host=self._host, port=self._port, database=self._database, gzip=self._gzip, session=influx_session)
+                client         = PVForecast._influx_client
+                sql            = self._sql.format(startTime, endTime)
                 select         = client.query(sql)
-                forecastDict   = []
-                hasData        = False
-                total          = 0
-                t_end          = None
-                duration       = None
-                for row in select.get_points():
-                    hasData    = True                                                    # if we don't get here, most likely 'power_field' was wrongly configured
-                    period_end = row['time'].replace("Z", "+00:00")                      # Influx returns period_start, so we need add 5min
-                    if t_end is None: 
-                        t_end = datetime.strptime(row['time'], '%Y-%m-%dT%H:%M:%SZ')
-                    else:
-                        if duration is None:
-                            t_start  = datetime.strptime(row['time'], '%Y-%m-%dT%H:%M:%SZ')
-                            duration = round((t_end - t_start).total_seconds()/60)       # forecast period in minutes, rounded to minute
-                            duration = duration/60
-                    avail      = (row['forecast'])
-                    if avail < 0: avail = 0
-                    forecastDict.append( { 'period_end' : pd.to_datetime(period_end),
-                                           'forecast'   : avail,
-                                           'remain'     : total } )
-                    total     += avail
-                if not hasData:
+                rows           = list(select.get_points())
+                if len(rows) == 0:                                                       # most likely 'power_field' was wrongly configured
                     raise Exception("ERROR --- no forecast data found")
-                self.forecast = pd.DataFrame.from_dict(forecastDict).iloc[::-1]
-                self.forecast['forecast'] = self.forecast['forecast'] * duration         # scale kW --> kWh
-                self.forecast['remain']   = self.forecast['remain']   * duration
-                self.date     = now.date()
+                df             = pd.DataFrame(rows)                                      # rows are in DESC time order
+                df['period_end'] = pd.to_datetime(df['time'], format='%Y-%m-%dT%H:%M:%SZ', utc=True)
+                duration       = None
+                if len(df) > 1:
+                    duration   = round((df['period_end'].iloc[0] - df['period_end'].iloc[1]).total_seconds()/60)/60
+                avail          = df['forecast'].clip(lower=0).to_numpy()                 # forecast period in hours, rounded to minute
+                df['forecast'] = avail*duration                                          # scale kW --> kWh
+                df['remain']   = np.concatenate(([0.0], np.cumsum(avail[:-1])))*duration # remaining energy = sum over later periods
+                self.forecast  = df[['period_end', 'forecast', 'remain']].iloc[::-1]
+                self.date      = now.date()
             return(self.forecast)
         except Exception as e:
             print("getForecast: " + str(e))
@@ -24,6 +24,8 @@ import json
 import requests
 import os
 import sys
+from urllib.parse import quote
+from functools import lru_cache
 
 import random
 import string
@@ -35,6 +37,19 @@ from Crypto.Cipher import AES
 import pandas as pd
 from .pvmonitortemplate import PVMonitorTemplate
 
+try:
+    import orjson                                                                        # considerably faster JSON decoding, if installed
+    _orjson_installed = True
+except ImportError:
+    _orjson_installed = False
+
+@lru_cache(maxsize=None)
+def _encode(endpoint):
+    """
+    URL-encode an endpoint path; cached since the same few endpoints repeat every tick
+    """
+    return(quote(endpoint, safe='/'))
+
 class Kostal (PVMonitorTemplate):
     """
     This class implements communication to a Kostal Plenticore inverter with software version 1.18.
@@ -52,17 +67,52 @@ class Kostal (PVMonitorTemplate):
             if not self._base_url.startswith('http://'): self._base_url = 'http://' + self._base_url
             self._pass_wd     = self.config['Kostal'].get('passwd')
             self.headers      = {'Content-type': 'application/json', 'Accept': 'application/json'}
+            self._session     = requests.Session()                                       # keep-alive connection to the inverter
+            self._session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
             self.verbose      = self.config['Kostal'].getboolean('verbose', False)
+            self._settingsCache = None                                                   # settings change rarely - cached until _setSetting writes
             self.inhibitWrite = self.config['Kostal'].getboolean('inhibitWrite', False)
-            self._LogMeIn()
+            self.keepSession  = self.config['Kostal'].getboolean('keepSession', False)   # cache session across restarts, skipping the PBKDF2 handshake
+            self._strings     = self.config['Kostal'].getint('strings', 2)               # number of active MPPT strings (pv1, pv2)
+            self._sessionFile = self.config['Kostal'].get('sessionFile', './kostal.session')
+            if not (self.keepSession and self._tryCachedSession()):
+                self._LogMeIn()
         except Exception as e:
             print('Kostal.__init__: ' + str(e))
             sys.exit(1)
 
     def __del__ (self):
-        if 'authorization' in self.headers:
+        if 'authorization' in self.headers and not self.keepSession:                     # with keepSession, the inverter expires the session itself
             self._LogMeOut()
 
+    def _tryCachedSession(self):
+        """
+        Re-use the session id cached by a previous run, if the inverter still accepts it.
+        Skips the costly PBKDF2 handshake and its three HTTP round-trips on restart.
+        """
+        try:
+            with open(self._sessionFile) as file:
+                sessionId = file.read().strip()
+            if sessionId == '':
+                return(False)
+            headers = dict(self.headers, authorization = "Session " + sessionId)
+            r       = self._session.get(url = self._base_url + _encode('/processdata/devices:local/Home_P'), headers = headers)
+            if r.reason != 'OK':                                                         # session expired - fall back to full login
+                return(False)
+            self.headers['authorization'] = "Session " + sessionId
+            return(True)
+        except (OSError, requests.RequestException):
+            return(False)
+
+    def _cacheSession(self):
+        try:
+            fd = os.open(self._sessionFile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)    # session id is a credential - owner-only file
+            with os.fdopen(fd, 'w') as file:
+                file.write(self.headers['authorization'].replace('Session ', '', 1))
+        except OSError as e:
+            print('Kostal._cacheSession: ERROR --- unable to cache session: ' + str(e))
+        return()
+
     def _LogMeIn(self):
         # this routine is derivative work from:
         # https://stackoverflow.com/questions/59053539/api-call-portation-from-java-to-python-kostal-plenticore-inverter
@@ -111,6 +161,8 @@ class Kostal (PVMonitorTemplate):
             
             response = self._postData("/auth/create_session", step3)
             self.headers['authorization'] = "Session " + response['sessionId']
+            if self.keepSession:
+                self._cacheSession()
         except Exception as e:
             print ("Kostal._LogMeIn: ERROR --- unable to login: " + str(e))
             sys.exit(1)
@@ -126,24 +178,22 @@ class Kostal (PVMonitorTemplate):
 
     def _getData(self, endpoint):
         try:
-            e = endpoint.replace(':', '%3A')
-            e = e.replace(',', '%2C')
-            r = requests.get(url = self._base_url + e, headers = self.headers)
+            r = self._session.get(url = self._base_url + _encode(endpoint), headers = self.headers)
             if r.reason != 'OK': 
                 raise Exception("request to endpoint=" + endpoint + " --- Reason: " + r.reason)
-            return(r.json())
+            return(orjson.loads(r.content) if _orjson_installed else r.json())
         except Exception as e:
             print("Kostal._getData: " + str(e))
             return(None)
 
     def _postData(self, endpoint, data = None, isPut = False):
         try:
-            e = endpoint.replace(':', '%3A')
-            if isPut: r = requests.put (url = self._base_url + e, json = data, headers = self.headers)
-            else:     r = requests.post(url = self._base_url + e, json = data, headers = self.headers)
+            e = _encode(endpoint)
+            if isPut: r = self._session.put (url = self._base_url + e, json = data, headers = self.headers)
+            else:     r = self._session.post(url = self._base_url + e, json = data, headers = self.headers)
             if r.reason != 'OK':
                 raise Exception("request to endpoint=" + endpoint + "; data=" + str(data) + " --- Reason: " + r.reason)
-            return(r.json())
+            return(orjson.loads(r.content) if _orjson_installed else r.json())
         except Exception as e:
             print("ERROR -- Kostal._postData: " + str(e))
             return(None)
@@ -152,6 +202,7 @@ class Kostal (PVMonitorTemplate):
         if not self.inhibitWrite:
             data = [ {"settings" : [ {"id":key, "value":str(value)} ], "moduleid":"devices:local"} ]
             self._postData('/settings', data, isPut=True)
+            self._settingsCache = None                                                   # force re-read on next getStatus
         if self.verbose:
             print('Kostal._setSetting: ' + str(key) + " = " + str(value))
         return()
@@ -171,23 +222,32 @@ class Kostal (PVMonitorTemplate):
                 smart_bat_ctrl   : smart battery control enabled / disabled
         """
         status                     = {}
-        data                       = self._getData('/processdata/devices:local/Home_P,Grid_P,LimitEvuAbs')[0]['processdata']
-        status['home_consumption'] = [elem['value'] for elem in data if elem['id'] == 'Home_P'][0]
-        status['grid_power']       = [elem['value'] for elem in data if elem['id'] == 'Grid_P'][0]
-        status['feedinLimit']      = [elem['value'] for elem in data if elem['id'] == 'LimitEvuAbs'][0]
-        status['dc_power']         = self._getData('/processdata/devices:local:pv1/P')[0]['processdata'][0]['value']
-        status['dc_power']        += self._getData('/processdata/devices:local:pv2/P')[0]['processdata'][0]['value']
+        query                      = [ { "moduleid": "devices:local",         "processdataids": ["Home_P", "Grid_P", "LimitEvuAbs"] },
+                                       { "moduleid": "devices:local:ac",      "processdataids": ["L1_U", "L2_U", "L3_U"] },
+                                       { "moduleid": "devices:local:battery", "processdataids": ["P", "SoC"] } ]
+        query                     += [ { "moduleid": "devices:local:pv" + str(n+1), "processdataids": ["P"] }
+                                       for n in range(self._strings) ]
+        modules                    = self._postData('/processdata', query)               # all process data in one round-trip
+        modules                    = { m['moduleid']: { e['id']: e['value'] for e in m['processdata'] } for m in modules }
+        data                       = modules['devices:local']
+        status['home_consumption'] = data['Home_P']
+        status['grid_power']       = data['Grid_P']
+        status['feedinLimit']      = data['LimitEvuAbs']
+        status['dc_power']         = sum(modules['devices:local:pv' + str(n+1)]['P'] for n in range(self._strings))
         if status['dc_power'] < 0: status['dc_power'] = 0
-        data                       = self._getData('/processdata/devices:local:ac/L1_U,L2_U,L3_U')[0]['processdata']
-        status['grid_voltage']     = sum([elem['value'] for elem in data])/3
-        data                       = self._getData('/processdata/devices:local:battery/P,SoC,LimitEvuAbs')[0]['processdata']
-        status['bat_power']        = [elem['value'] for elem in data if elem['id'] == 'P'][0]
-        status['soc']              = [elem['value'] for elem in data if elem['id'] == 'SoC'][0]/100
-        data                       = self._getData('/settings/devices:local/Battery:ExternControl:MaxChargePowerAbs,Battery:ExternControl:MaxSocRel,Battery:SmartBatteryControl:Enable,Battery:MinSoc')
-        status['max_bat_charge']   = float([elem['value'] for elem in data if elem['id'] == 'Battery:ExternControl:MaxChargePowerAbs'][0])      # strangely, returns string
-        status['max_soc']          = float([elem['value'] for elem in data if elem['id'] == 'Battery:ExternControl:MaxSocRel'][0])/100          # strangely, returns string
-        status['smart_bat_ctrl']   = int([elem['value'] for elem in data if elem['id'] == 'Battery:SmartBatteryControl:Enable'][0])             # strangely, returns string
-        status['minSoc']           = int([elem['value'] for elem in data if elem['id'] == 'Battery:MinSoc'][0])/100                             # strangely, returns string
+        data                       = modules['devices:local:ac']
+        status['grid_voltage']     = (data['L1_U'] + data['L2_U'] + data['L3_U'])/3
+        data                       = modules['devices:local:battery']
+        status['bat_power']        = data['P']
+        status['soc']              = data['SoC']/100
+        if self._settingsCache is None:                                                  # only hit /settings after a write (or on first call)
+            data                   = self._getData('/settings/devices:local/Battery:ExternControl:MaxChargePowerAbs,Battery:ExternControl:MaxSocRel,Battery:SmartBatteryControl:Enable,Battery:MinSoc')
+            self._settingsCache    = { e['id']: e['value'] for e in data }
+        data                       = self._settingsCache
+        status['max_bat_charge']   = float(data['Battery:ExternControl:MaxChargePowerAbs'])                                                    # strangely, returns string
+        status['max_soc']          = float(data['Battery:ExternControl:MaxSocRel'])/100                                                        # strangely, returns string
+        status['smart_bat_ctrl']   = int(data['Battery:SmartBatteryControl:Enable'])                                                           # strangely, returns string
+        status['minSoc']           = int(data['Battery:MinSoc'])/100                                                                           # strangely, returns string
 
         status                     = pd.Series(status, name = pd.Timestamp.utcnow())
         self.status                = status
@@ -5,6 +5,7 @@ This file is part of the PVOptimize project, licensed under Gnu General Public L
 import pandas as pd
 from influxdb import InfluxDBClient
 from .pvmonitortemplate import PVMonitorTemplate
+from ..influxsession import influx_session
 
 class SolarAnzeige(PVMonitorTemplate):
     """
@@ -27,50 +28,69 @@ class SolarAnzeige(PVMonitorTemplate):
 
     Public methods are described in abstract Class PVMonitorTemplate
     """
+    _fields = { 'PV'       : '"Gesamtleistung"',                                        # per-table field lists - only what getStatus consumes
+                'AC'       : '"Spannung_R", "Spannung_S", "Spannung_T", "Verbrauch", "Verbrauch_Batterie", "Verbrauch_Netz", "Verbrauch_PV", "KSEM_Leistung", "Einspeisung"',
+                'Batterie' : '"SOC", "Spannung", "Strom"' }
+
     def __init__(self, config):
         self.config           = config
         host                  = self.config['SolarAnzeige'].get('host')
         port                  = self.config['SolarAnzeige'].getint('port', 8086)
         database              = self.config['SolarAnzeige'].get('database')
-        self._influx          = InfluxDBClient(host=host, port=port, database=database)
+        self._influx          = InfluxDBClient(host=host, port=port, database=database, session=influx_session)
 
 
     def getStatus(self, start = None, stop = None):
-        pv       = self._query('PV',       start, stop)
-        ac       = self._query('AC',       start, stop)
-        bat      = self._query('Batterie', start, stop)
-        pvDict   = []
-        acDict   = []
-        batDict  = []
-        for row in pv.get_points():
-            pvDict.append( { 'datetime'     : row['time'],
-                             'dc_power'     : row['Gesamtleistung']})
-        pvDF           = pd.DataFrame.from_dict(pvDict)
-        for row in ac.get_points():
-            if 'KSEM_Leistung' in row: grid_power =  row['KSEM_Leistung']                # not an 'official' solaranzeige field
-            else:                      grid_power = -row['Einspeisung']                  # >0 = grid consumption, <0 = feed-in
-            acDict.append( { 'datetime'              : row['time'],
-                             'grid_voltage'          : (row['Spannung_R'] + row['Spannung_S'] + row['Spannung_T'])/3,
-                             'home_consumption'      : row['Verbrauch'],
-                             'home_consumption_bat'  : row['Verbrauch_Batterie'],
-                             'home_consumption_grid' : row['Verbrauch_Netz'],
-                             'home_consumption_pv'   : row['Verbrauch_PV'],
-                             'grid_power'            : grid_power })
-        acDF           = pd.DataFrame.from_dict(acDict)
-        for row in bat.get_points():
-            batDict.append( { 'datetime'     : row['time'],
-                              'soc'          : row['SOC']/100,
-                              'bat_power'    : row['Spannung']*row['Strom'],             # >0 = battery charge, <0 = discharge
-                              'bat_voltage'  : row['Spannung'],
-                              'bat_current'  : row['Strom']})
-        batDF              = pd.DataFrame.from_dict(batDict)
+        pv, ac, bat = self._query(('PV', 'AC', 'Batterie'), start, stop)                 # one round-trip for all three tables
+        if start is None and stop is None:                                               # active controller context: build one Series, skip all DataFrames
+            pvRows  = list(pv.get_points())
+            acRows  = list(ac.get_points())
+            batRows = list(bat.get_points())
+            times   = { r['time'] for r in pvRows } & { r['time'] for r in acRows } & { r['time'] for r in batRows }
+            t       = max(times)                                                         # newest timestamp present in all tables
+            pvRow   = next(r for r in pvRows  if r['time'] == t)
+            acRow   = next(r for r in acRows  if r['time'] == t)
+            batRow  = next(r for r in batRows if r['time'] == t)
+            if acRow.get('KSEM_Leistung') is not None: grid_power =  acRow['KSEM_Leistung']   # not an 'official' solaranzeige field - selected fields come back null if absent
+            else:                                      grid_power = -acRow['Einspeisung']      # >0 = grid consumption, <0 = feed-in
+            pvData  = pd.Series({ 'dc_power'              : pvRow['Gesamtleistung'],
+                                  'grid_voltage'          : (acRow['Spannung_R'] + acRow['Spannung_S'] + acRow['Spannung_T'])/3,
+                                  'home_consumption'      : acRow['Verbrauch'],
+                                  'home_consumption_bat'  : acRow['Verbrauch_Batterie'],
+                                  'home_consumption_grid' : acRow['Verbrauch_Netz'],
+                                  'home_consumption_pv'   : acRow['Verbrauch_PV'],
+                                  'grid_power'            : grid_power,
+                                  'soc'                   : batRow['SOC']/100,
+                                  'bat_power'             : batRow['Spannung']*batRow['Strom'],   # >0 = battery charge, <0 = discharge
+                                  'bat_voltage'           : batRow['Spannung'],
+                                  'bat_current'           : batRow['Strom'] },
+                                name = pd.to_datetime(t))
+            return(pvData)
+        pvRaw          = pd.DataFrame(list(pv.get_points()))                            # vectorized column math instead of per-row dicts
+        pvDF           = pd.DataFrame({ 'datetime' : pvRaw['time'],
+                                        'dc_power' : pvRaw['Gesamtleistung'] })
+        acRaw          = pd.DataFrame(list(ac.get_points()))
+        if 'KSEM_Leistung' in acRaw.columns and acRaw['KSEM_Leistung'].notna().any():
+                                             grid_power =  acRaw['KSEM_Leistung']        # not an 'official' solaranzeige field
+        else:                                grid_power = -acRaw['Einspeisung']          # >0 = grid consumption, <0 = feed-in
+        acDF           = pd.DataFrame({ 'datetime'              : acRaw['time'],
+                                        'grid_voltage'          : (acRaw['Spannung_R'] + acRaw['Spannung_S'] + acRaw['Spannung_T'])/3,
+                                        'home_consumption'      : acRaw['Verbrauch'],
+                                        'home_consumption_bat'  : acRaw['Verbrauch_Batterie'],
+                                        'home_consumption_grid' : acRaw['Verbrauch_Netz'],
+                                        'home_consumption_pv'   : acRaw['Verbrauch_PV'],
+                                        'grid_power'            : grid_power })
+        batRaw         = pd.DataFrame(list(bat.get_points()))
+        batDF          = pd.DataFrame({ 'datetime'    : batRaw['time'],
+                                        'soc'         : batRaw['SOC']/100,
+                                        'bat_power'   : batRaw['Spannung']*batRaw['Strom'],   # >0 = battery charge, <0 = discharge
+                                        'bat_voltage' : batRaw['Spannung'],
+                                        'bat_current' : batRaw['Strom'] })
 
-        pvData             = pd.merge(pvDF,   acDF,  on='datetime', how='inner')         # may drop a row if not both tables were already updated 
-        pvData             = pd.merge(pvData, batDF, on='datetime', how='inner')
-        pvData['datetime'] = pd.to_datetime(pvData['datetime'])
-        pvData.set_index('datetime', inplace=True)
-        if start is None and stop is None:                                               # we are in active controller context
-            pvData = pvData.iloc[0]
+        for df in (pvDF, acDF, batDF):                                                   # align on a datetime index - join is cheaper than column merges
+            df['datetime'] = pd.to_datetime(df['datetime'])
+            df.set_index('datetime', inplace=True)
+        pvData             = pvDF.join([acDF, batDF], how='inner')                       # may drop a row if not all tables were already updated
         return(pvData)
 
     def setBatCharge(self):
@@ -80,10 +100,12 @@ class SolarAnzeige(PVMonitorTemplate):
         '''
         pass
 
-    def _query(self, table, start = None, stop = None):
+    def _query(self, tables, start = None, stop = None):
         if start is None and stop is None:
-            sql  = 'SELECT * FROM "' + table + '" ORDER BY time DESC LIMIT 2'            # return two, so that after merge we have at least one
+            sql  = ';'.join('SELECT ' + self._fields[table] + ' FROM "' + table + '" ORDER BY time DESC LIMIT 2'   # return two, so that after merge we have at least one
+                            for table in tables)
         else:
-            sql  = 'SELECT * FROM "' + table + '"' + "WHERE time > '" + start + "' AND time < '" + stop + "'"
-        data = self._influx.query(sql)
+            sql  = ';'.join('SELECT ' + self._fields[table] + ' FROM "' + table + '"' + "WHERE time > '" + start + "' AND time < '" + stop + "'"
+                            for table in tables)
+        data = self._influx.query(sql)                                                   # multi-statement query - returns one ResultSet per table
         return(data)
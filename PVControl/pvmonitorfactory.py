@@ -1,14 +1,16 @@
-from .pvmonitor.solaranzeige import SolarAnzeige
-from .pvmonitor.kostal       import Kostal
+from importlib import import_module
 
 class PVMonitorFactory:
     '''
     Calls appropriate implementation of PVMonitorTemplate, based on parameter 'source'
     '''
+    _registry = { 'SolarAnzeige': ('.pvmonitor.solaranzeige', 'SolarAnzeige'),           # lazy imports - influxdb loads only when SolarAnzeige is selected
+                  'Kostal'      : ('.pvmonitor.kostal',       'Kostal') }
 
     def getPVMonitor(self, source, config):
-        pvmonitor   = None
-        if   source == 'SolarAnzeige': pvmonitor = SolarAnzeige(config)
-        elif source == 'Kostal'      : pvmonitor = Kostal(config)
-        else: raise ValueError()
-        return(pvmonitor)
\ No newline at end of file
+        try:
+            module, cls = self._registry[source]
+        except KeyError:
+            raise ValueError(source)
+        pvmonitor = getattr(import_module(module, package=__package__), cls)(config)
+        return(pvmonitor)
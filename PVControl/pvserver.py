@@ -19,7 +19,7 @@ from astral import LocationInfo
 from astral.sun import sun
 from datetime import datetime, timedelta, time
 import pandas as pd
-import random
+import numpy as np
 
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
@@ -29,6 +29,24 @@ from .pvmodel.pvmodel       import PVModel
 from .pvmonitorfactory      import PVMonitorFactory
 from .pvforecast.pvforecast import PVForecast
 
+_hourLocator = mdates.HourLocator(interval=1)                                            # tick helpers are stateless - share across plot() calls
+_hourFormat  = mdates.DateFormatter('%H:%M')
+
+class _SimRow:
+    """
+    Mutable stand-in for one pd.Series row of pvData; supports the attribute access, .name,
+    .items() and .to_dict() that PVControl expects, without the per-row Series construction cost
+    """
+    def __init__(self, name, fields):
+        self.name = name
+        self.__dict__.update(fields)
+
+    def items(self):
+        return((k, v) for k, v in self.__dict__.items() if k != 'name')
+
+    def to_dict(self):
+        return(dict(self.items()))
+
 class PVServer:
     """
     Simulate a rooftop PV system with battery, based on measured data from Solaranzeige
@@ -60,6 +78,10 @@ class PVServer:
         endDate                 = datetime.strptime(self.config['PVServer'].get('endDate', startDate), '%Y-%m-%d')
         delta                   = endDate - startDate
         self.days               = [startDate + timedelta(days=x) for x in range(delta.days+1)]               # days to iterate over 
+        latitude                = self.config['PVSystem'].getfloat('Latitude')
+        longitude               = self.config['PVSystem'].getfloat('Longitude')
+        location                = LocationInfo('na', 'na', 'UTC', latitude=latitude, longitude=longitude)
+        self._daylight          = { day: sun(location.observer, date=day) for day in self.days }             # sunrise/sunset per simulated day
 
         self._startTime         = self._time(self.config['PVServer'].get('startTime', None))
         self._endTime           = self._time(self.config['PVServer'].get('endTime', None))
@@ -77,9 +99,14 @@ class PVServer:
         self.maxConsumption     = self.config['PVServer'].getint('maxConsumption', 99999)                    # consumption above this value is removed (default 99999 inhibits removal)
         self.baseConsumption    = self.config['PVServer'].getint('baseConsumption',  350)                    # ... replaced with baseConsume
         self.sigmaConsumption   = self.config['PVServer'].getint('sigmaConsumption',  50)                    # ... +- sigmaConsume; no jittering if zero --> reproducible results
+        seed                    = self.config['PVServer'].getint('seed', None)                               # fixed seed --> reproducible jitter
+        self._rng               = np.random.default_rng(seed)
 
         self.feedInLimit        = self.config['PVServer'].getint('feedInLimit', 99999)
 
+        if self.config['PVServer'].getboolean('storePNG', False):                                           # PNG-only runs don't need a GUI backend
+            plt.switch_backend('Agg')
+
         connectTime             = self.config['PVServer'].get('connectTime', None)                           # when we connect car for charging
         if connectTime is not None:
             h, m                = connectTime.split(':')
@@ -98,10 +125,7 @@ class PVServer:
         """
         Get sunrise/sunset - we only simulate during daylight
         """
-        latitude  = self.config['PVSystem'].getfloat('Latitude')
-        longitude = self.config['PVSystem'].getfloat('Longitude')
-        location  = LocationInfo('na', 'na', 'UTC', latitude=latitude, longitude=longitude)
-        mySun     = sun(location.observer, date=day)
+        mySun     = self._daylight[day]                                                  # precomputed in __init__ for all simulated days
         sunrise   = mySun['sunrise'].strftime('%Y-%m-%dT%H:%M:%SZ')
         sunset    = mySun['sunset'].strftime('%Y-%m-%dT%H:%M:%SZ')
         return(sunrise, sunset)
@@ -113,14 +137,18 @@ class PVServer:
         myRow                  returns data for time stamp. home_consumption is modifed so
                                that existing EV charging consumption is filtered out
         """
-        for index, row in self.pvData.iterrows():
-            self.currTime = index
-            myRow         = row.copy()
-            if (myRow['home_consumption'] > self.maxConsumption):
-                if self.sigmaConsumption > 0:
-                    myRow['home_consumption'] = random.gauss(self.baseConsumption, self.sigmaConsumption)
-                else:
-                    myRow['home_consumption'] = self.baseConsumption
+        consumption = self.pvData['home_consumption'].to_numpy(copy=True)                           # jitter vectorially, without touching self.pvData
+        mask        = consumption > self.maxConsumption
+        if mask.any():
+            if self.sigmaConsumption > 0:
+                consumption[mask] = self._rng.normal(self.baseConsumption, self.sigmaConsumption, int(mask.sum()))
+            else:
+                consumption[mask] = self.baseConsumption
+        columns     = list(self.pvData.columns)
+        for i, row in enumerate(self.pvData.itertuples(index=True, name=None)):
+            self.currTime = row[0]
+            myRow         = _SimRow(row[0], dict(zip(columns, row[1:])))
+            myRow.home_consumption = consumption[i]
             yield myRow
 
     def getDayData(self, day: datetime):
@@ -137,6 +165,8 @@ class PVServer:
  
         clearsky        = self.pvsystem.runModel(self.pvData, 'clearsky')
         self.pvData     = pd.concat([self.pvData, clearsky['dc_clearsky']], axis = 1)
+        for col in self.pvData.select_dtypes('float64').columns:                         # float32 is plenty for power/soc figures, halves memory traffic
+            self.pvData[col] = self.pvData[col].astype('float32')
 
     def runController(self):
         """
@@ -174,6 +204,9 @@ class PVServer:
         carstatus     = { 'connected'        : 0,
                           'charge_completed' : 0 }
         totCtrlPower  =  0
+        dTs           = np.empty(len(self.pvData))                                                           # time since last simulation interval, in hours
+        dTs[0]        = 1/60
+        dTs[1:]       = np.diff(self.pvData.index.to_numpy()).astype('timedelta64[s]').astype(np.float64)/3600
         for pvstatus in self._dataGen():
             controlObj  = PVControl(self.config)
             pvstatus.home_consumption += prevCtrlPower                                                       # control power of previous step must be added to home consumption
@@ -207,13 +240,15 @@ class PVServer:
             if ctrl['ctrl_power'] < 0:
                 raise Exception("ERROR --- controller " + controlObj.Name + " can only consume, not produce power; " + str(self.currTime))
 
-            if 'dc_power'         not in ctrl: ctrl['dc_power']         = pvstatus.dc_power                  # a controller might potentially re-calculate these elements
-            if 'home_consumption' not in ctrl: ctrl['home_consumption'] = pvstatus.home_consumption - prevCtrlPower
-            if 'min_soc'          not in ctrl: ctrl['min_soc']          = self.minSOC
-            if 'max_soc'          not in ctrl: ctrl['max_soc']          = 1
-            if 'fastcharge'       not in ctrl: ctrl['fastcharge']       = True
-            if 'inhibitDischarge' not in ctrl: ctrl['inhibitDischarge'] = False
-            if 'bat_forecast'     not in ctrl: ctrl['bat_forecast']     = 0
+            defaults               = { 'dc_power'         : pvstatus.dc_power,                               # a controller might potentially re-calculate these elements
+                                       'home_consumption' : pvstatus.home_consumption - prevCtrlPower,
+                                       'min_soc'          : self.minSOC,
+                                       'max_soc'          : 1,
+                                       'fastcharge'       : True,
+                                       'inhibitDischarge' : False,
+                                       'bat_forecast'     : 0 }
+            for key, default in defaults.items():
+                ctrl.setdefault(key, default)
             if totCtrlPower > self.chargePower:
                 carstatus['charge_completed'] = 1
                 ctrl['ctrl_power'] = 0
@@ -223,8 +258,7 @@ class PVServer:
             ctrl['datetime']       = self.currTime                                                           # ---------- react to controller result
             ctrl['grid_power']     = 0                                                                       # these elements are part of simulator
             ctrl['bat_power']      = 0
-            dT                     = 1/60
-            if (i > 0): dT         = (self.currTime - ctrlResult[i-1]['datetime']).seconds/3600              # time since last simulation interval, in hours
+            dT                     = dTs[i]                                                                  # precomputed above
             ctrl['waste_power']    = pvstatus.waste_power
             
             surpluspower = ctrl['dc_power']*e - ctrl['home_consumption'] - ctrl['ctrl_power'] + pvstatus.waste_power        # available surplus power before battery charge
@@ -268,9 +302,11 @@ class PVServer:
   
             ctrlResult.append(ctrl)                                                                          # ---------- build full-day controller result data
             i += 1
-            self.ctrlData = pd.DataFrame.from_dict(ctrlResult)
-            self.ctrlData.set_index('datetime', inplace=True)
             del  controlObj
+        self.ctrlData = pd.DataFrame.from_dict(ctrlResult)                                                   # nothing reads ctrlData before the day is done - build it once
+        self.ctrlData.set_index('datetime', inplace=True)
+        for col in self.ctrlData.select_dtypes('float64').columns:                                           # float32 is plenty for power/soc figures
+            self.ctrlData[col] = self.ctrlData[col].astype('float32')
 
     def plot(self, hasCtrl):
         """
@@ -300,12 +336,10 @@ class PVServer:
         datemin   = min(idx)                                                             # axis range
         datemax   = max(idx)
         day     = self.day.strftime('%Y-%m-%d')
-        axes[0][0].plot(idx, self.pvData['dc_power'],         label='dc_power')
-        axes[0][0].plot(idx, self.pvData['bat_power'],        label='bat_power')
-        axes[0][0].plot(idx, self.pvData['grid_power'],       label='grid_power')
-        axes[0][0].plot(idx, self.pvData['home_consumption'], label='home_consumption')
+        cols      = ['dc_power', 'bat_power', 'grid_power', 'home_consumption']
         if ('dc_clearsky' in self.pvData):
-           axes[0][0].plot(idx, self.pvData['dc_clearsky'],   label='dc_clearsky')
+            cols.append('dc_clearsky')
+        self.pvData[cols].plot(ax=axes[0][0], x_compat=True)                             # one call for all curves; x_compat keeps mdates formatting below working
         axes[0][0].axhline(self.feedInLimit, ls='--', linewidth = 0.5, color = 'black')
         axes[0][0].axhline(self.feedInLimit/self.InverterEff + self.baseConsumption, ls='--', linewidth = 0.5, color = 'blue')
         axes[0][0].axhline(-self.feedInLimit, ls='--', linewidth = 0.5, color = 'green')
@@ -319,12 +353,8 @@ class PVServer:
 
         if hasCtrl:
             idx       = self.ctrlData.index.values
-            axes[0][1].plot(idx, self.ctrlData['dc_power'],         label='dc_power')
-            axes[0][1].plot(idx, self.ctrlData['bat_power'],        label='bat_power')
-            axes[0][1].plot(idx, self.ctrlData['grid_power'],       label='grid_power')
-            axes[0][1].plot(idx, self.ctrlData['home_consumption'], label='home_consumption')
-            axes[0][1].plot(idx, self.ctrlData['ctrl_power'],       label='ctrl_power')
-            axes[0][1].plot(idx, self.ctrlData['waste_power'],      label='waste_power')
+            cols      = ['dc_power', 'bat_power', 'grid_power', 'home_consumption', 'ctrl_power', 'waste_power']
+            self.ctrlData[cols].plot(ax=axes[0][1], x_compat=True)
             axes[0][1].axhline(-self.feedInLimit, ls='--', linewidth = 0.5, color = 'green')
             axes[1][1].plot(idx, self.ctrlData['bat_forecast']*100, label='bat_forecast%', color='lightgray')
             axes[1][1].plot(idx, self.ctrlData['soc']*100,          label='soc')
@@ -335,13 +365,13 @@ class PVServer:
             axes[0][1].legend(loc='best')
             axes[1][1].legend(loc='best')
         
-            summary                  = self.ctrlData.sum(axis=0)/60
-            summary['bat_charge']    = self.ctrlData[self.ctrlData['bat_power']>0]['bat_power'].sum()/60
-            summary['bat_discharge'] = self.ctrlData[self.ctrlData['bat_power']<0]['bat_power'].sum()/60
-
-            keepLabels   = [ label for label in summary.index if label in 
-                             ['ctrl_power', 'dc_power', 'home_consumption', 'grid_power', 'bat_power', 'waste_power', 'bat_charge', 'bat_discharge']]
-            summary      = summary[keepLabels]
+            sumLabels    = [ label for label in
+                             ['ctrl_power', 'dc_power', 'home_consumption', 'grid_power', 'bat_power', 'waste_power']
+                             if label in self.ctrlData.columns ]
+            summary      = self.ctrlData[sumLabels].sum(axis=0)/60
+            bat_power    = self.ctrlData['bat_power'].to_numpy()
+            summary['bat_charge']    = bat_power.clip(min=0).sum()/60                    # one pass each, no boolean-indexed intermediate frames
+            summary['bat_discharge'] = bat_power.clip(max=0).sum()/60
             summary.name = self.day
         else:
             summary = None
@@ -349,10 +379,8 @@ class PVServer:
         plt.subplots_adjust(hspace=0)
         plt.rcParams['axes.grid'] = True
 
-        hours = mdates.HourLocator(interval=1)                                           # format the ticks
-        h_fmt = mdates.DateFormatter('%H:%M')
-        axes[0][0].xaxis.set_major_locator(hours)
-        axes[0][0].xaxis.set_major_formatter(h_fmt)
+        axes[0][0].xaxis.set_major_locator(_hourLocator)                                 # format the ticks
+        axes[0][0].xaxis.set_major_formatter(_hourFormat)
         axes[0][0].set_xlim(datemin, datemax)
 
         fig.autofmt_xdate()                                                              # rotate x-labels, manage space
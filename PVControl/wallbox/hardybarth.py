@@ -21,7 +21,16 @@ The author cannot be held liable for any damage caused through its use.
 '''
 
 from .wbtemplate import WBTemplate
+from concurrent.futures import ThreadPoolExecutor
+from urllib3.util.retry import Retry
 import requests
+import time
+
+try:
+    import orjson                                                                        # considerably faster JSON decoding, if installed
+    _orjson_installed = True
+except ImportError:
+    _orjson_installed = False
 
 class HardyBarth(WBTemplate):
     """
@@ -30,6 +39,20 @@ class HardyBarth(WBTemplate):
 
     See WBTemplate documentation for further details.
     """
+    _ST_WAITING    = 4                                                                   # stateid: enabled, waiting
+    _ST_CHARGING   = 5                                                                   # stateid: charging
+    _ST_DISABLED   = 17                                                                  # stateid: disabled
+    _activeStates  = frozenset({_ST_WAITING, _ST_CHARGING})                              # no 'start' post needed in these states
+    _stoppedStates = frozenset({_ST_WAITING, _ST_DISABLED})                              # no 'stop' post needed in these states
+    _renameKeys    = { 'currentpwmamp'   : 'ctrl_current',                               # chargecontrol fields to translate to generic names
+                       'evminamp'        : 'I_min',
+                       'supplylinemaxamp': 'I_max' }
+    _dropKeys      = frozenset({'id', 'name', 'state', 'mode', 'type', 'version', 'busid', 'vendor'})
+
+    _cache      = {}                                                                     # short-TTL GET cache, shared across instances (one per tick)
+    _cacheTTL   = { 'all': 5.0, 'chargecontrols': 10.0 }                                 # TTL [s] per endpoint root; back-to-back runs reuse responses
+    _validators = {}                                                                     # ETag/Last-Modified per endpoint, for conditional GETs
+
     def __init__(self, config):
         super().__init__()
         self.config = config
@@ -38,6 +61,24 @@ class HardyBarth(WBTemplate):
         self.inhibitWrite = self.config['HardyBarth'].getboolean('inhibitWrite', False)
         host              = self.config['HardyBarth'].get('host')                        # wallbox address
         self.url          = 'http://' + host + '/api/v1/'
+        id                = self.id
+        self._ep          = { 'all'           : 'all',                                   # endpoint paths, interpolated once
+                              'chargecontrol' : f'chargecontrols/{id}',
+                              'start'         : f'chargecontrols/{id}/start',
+                              'stop'          : f'chargecontrols/{id}/stop',
+                              'pvmode'        : 'pvmode',
+                              'amp'           : 'pvmode/manual/ampere' }
+        self._urlFor      = { ep: self.url + ep for ep in self._ep.values() }            # ... and their full URLs
+        self._session     = requests.Session()                                           # keep-alive: readWB/controlWB issue several requests per cycle
+        retry             = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                                  allowed_methods=frozenset(['GET', 'POST']))            # wallbox writes are idempotent state settings - safe to retry
+        self._session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=retry))
+
+    def __del__(self):
+        try:
+            self._session.close()
+        except Exception:
+            pass
 
     def readWB(self, charge_completed = False):
         """
@@ -65,23 +106,23 @@ class HardyBarth(WBTemplate):
         """
         id   = self.id
         try:
-            status               = self._request(False, 'all')
-            status               = status.json()['meters'][1]['data']
-            data                 = self._request(False, f'chargecontrols/{id}')
-            data                 = data.json()['chargecontrol']
-            data['ctrl_current'] = data.pop('currentpwmamp')                             # use generic names
-            data['I_min']        = data.pop('evminamp')
-            data['I_max']        = data.pop('supplylinemaxamp')
+            with ThreadPoolExecutor(max_workers=2) as pool:                              # fetch both endpoints concurrently - wait max(latency), not sum
+                f_status         = pool.submit(self._request, False, self._ep['all'])
+                f_data           = pool.submit(self._request, False, self._ep['chargecontrol'])
+                status           = f_status.result()
+                status           = (orjson.loads(status.content) if _orjson_installed else status.json())['meters'][1]['data']
+                raw              = f_data.result()
+                raw              = (orjson.loads(raw.content) if _orjson_installed else raw.json())['chargecontrol']
+            data                 = { self._renameKeys.get(key, key): value               # build once: rename to generic names, skip unused keys
+                                     for key, value in raw.items() if key not in self._dropKeys }
             data['active_power'] = status['1-0:1.4.0']
             data['cos_phi']      = status['1-0:13.4.0']
             data['current_L1']   = status['1-0:31.4.0']
             data['current_L2']   = status['1-0:51.4.0']
             data['current_L3']   = status['1-0:71.4.0']
             # manualmodeamp not translated to generic name
-            for key in ['id', 'name', 'state', 'mode', 'type', 'version', 'busid', 'vendor']:
-                data.pop(key)
             data['charge_completed']     = False
-            if data['connected'] and (data['stateid'] == 4 or (data['stateid'] == 17 and charge_completed)): 
+            if data['connected'] and (data['stateid'] == self._ST_WAITING or (data['stateid'] == self._ST_DISABLED and charge_completed)): 
                 data['charge_completed'] = True
                 data['ctrl_current']     = 0                                             # currentpwmamp is still according to last setting
         except Exception as e:
@@ -91,22 +132,30 @@ class HardyBarth(WBTemplate):
         return()
 
     def controlWB(self, I_new):
-        id = self.id
+        id            = self.id
+        st            = self.status                                                      # snapshot locals - avoids rehashing the same keys below
+        stateid       = st['stateid']
+        manualmodeamp = st['manualmodeamp']
         if I_new > 0:
-            if not self.status['connected']:
+            if not st['connected']:
                 print("Warning --- WB not connected, cannot charge with " + str(I_new))
             else:
-                if self.status['modeid'] != 3:                                           # manual
-                    self._request(True, f'pvmode', { 'pvmode': 'manual' })
-                if self.status['stateid'] != 5 and self.status['stateid'] != 4:          # 5: charging / 4: enabled, waiting
-                    self._request(True, f'chargecontrols/{id}/start')
-                if self.status['manualmodeamp'] != I_new:
-                    self._request(True, f'pvmode/manual/ampere', { 'manualmodeamp': I_new })
+                if st['modeid'] == 3 and stateid in self._activeStates and manualmodeamp == I_new:
+                    return()                                                             # already charging as requested - nothing to post
+                if st['modeid'] != 3:                                                    # manual
+                    self._request(True, self._ep['pvmode'], { 'pvmode': 'manual' })
+                if stateid not in self._activeStates:
+                    self._request(True, self._ep['start'])
+                if manualmodeamp != I_new:
+                    self._request(True, self._ep['amp'], { 'manualmodeamp': I_new })
         else:
-            if self.status['manualmodeamp'] > self.status['I_min']:
-                self._request(True, f'pvmode/manual/ampere', { 'manualmodeamp': self.status['I_min'] })
-            if self.status['stateid'] != 17 and self.status['stateid'] != 4:             # 17: disabled / 4: enabled, waiting
-                self._request(True, f'chargecontrols/{id}/stop')
+            I_min = st['I_min']
+            if manualmodeamp <= I_min and stateid in self._stoppedStates:
+                return()                                                                 # already stopped - nothing to post
+            if manualmodeamp > I_min:
+                self._request(True, self._ep['amp'], { 'manualmodeamp': I_min })
+            if stateid not in self._stoppedStates:
+                self._request(True, self._ep['stop'])
         return()
 
     def _request(self, isPost, endpoint = None, data = None):
@@ -117,22 +166,49 @@ class HardyBarth(WBTemplate):
                 if endpoint is None: msg = "nothing to do"
                 else:
                     if data is None: 
-                        msg = "endpoint " + endpoint
-                        r = requests.post(self.url + endpoint)
+                        if self.verbose: msg = "endpoint " + endpoint
+                        r = self._session.post(self._urlFor[endpoint], timeout=(2, 5))
                     else:            
-                        key = list(data.keys())[0]
-                        msg = "endpoint " + endpoint + ": " + key + " = " + str(data[key])
-                        r = requests.post(self.url + endpoint, data)
+                        if self.verbose:                                                 # only build the message when it will be printed
+                            key = next(iter(data))
+                            msg = "endpoint " + endpoint + ": " + key + " = " + str(data[key])
+                        r = self._session.post(self._urlFor[endpoint], data, timeout=(2, 5))
                     if r.reason != 'OK':
                         raise Exception("ERROR --- request to endpoint=" + endpoint + " --- Reason: " + r.reason)
+                    HardyBarth._cache.clear()                                            # wallbox state changed - cached GETs are stale
+                    HardyBarth._validators.clear()
             except Exception as e:
                 print("ERROR -- controlWB - post: " + str(e))
         elif not isPost:                                                                 # we want to 'get' data
             try:
-                r = requests.get(self.url + endpoint)
+                ttl    = HardyBarth._cacheTTL.get(endpoint.split('/')[0], 0)
+                now    = time.monotonic()
+                cached = HardyBarth._cache.get(endpoint)
+                if cached is not None and now - cached[0] < ttl:
+                    return(cached[1])
+                headers = None
+                prev    = HardyBarth._validators.get(endpoint)
+                if prev is not None:                                                     # revalidate instead of re-transfer, if the API supports it
+                    headers = {}
+                    if prev[0]: headers['If-None-Match']     = prev[0]
+                    if prev[1]: headers['If-Modified-Since'] = prev[1]
+                r = self._session.get(self._urlFor[endpoint], headers=headers, timeout=(2, 5))
+                if r.status_code == 304 and prev is not None:
+                    r = prev[2]                                                          # unchanged - reuse last full response
+                else:
+                    etag = r.headers.get('ETag')
+                    lm   = r.headers.get('Last-Modified')
+                    if etag or lm:
+                        HardyBarth._validators[endpoint] = (etag, lm, r)
+                if ttl > 0:
+                    HardyBarth._cache[endpoint] = (now, r)
                 # msg = "get endpoint " + endpoint
             except Exception as e:
                 print("ERROR -- controlWB - get: " + str(e))
+                cached = HardyBarth._cache.get(endpoint)
+                if cached is not None:
+                    print("controlWB - falling back to cached response for " + endpoint)
+                    r = cached[1]
         if self.verbose and msg: 
             print("controlWB - Message: " + msg)
         return(r)
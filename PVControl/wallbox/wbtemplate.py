@@ -12,9 +12,21 @@ class WBTemplate(ABC):
         """
         A wallbox may not allow arbitrarily granular charge current control. This method is called to
         round the calculated charging current I to something the wallbox can actually do. By default
-        rounding down to integer value is done.
+        rounding down to integer value is done. Charge currents are physically non-negative, for
+        which plain int() truncation equals flooring and is cheaper.
         """
-        return(math.floor(I))
+        return(int(I) if I >= 0 else math.floor(I))
+
+    def valid_currents(self):
+        """
+        Returns the sorted set of charge currents [A] the wallbox can actually deliver, or None if
+        unknown (caller then falls back to round_current()). The default assumes full-amp steps
+        between I_min and I_max, consistent with round_current() above.
+        """
+        try:
+            return(list(range(math.ceil(self.status['I_min']), math.floor(self.status['I_max']) + 1)))
+        except (TypeError, KeyError):
+            return(None)
 
     @abstractmethod
     def readWB(self):
@@ -1,14 +1,18 @@
-from .wallbox.hardybarth import HardyBarth
-from .wallbox.wbtemplate import DummyWB
+from importlib import import_module
 
 class WallBoxFactory:
     '''
     Calls appropriate implementation of WBTemplate, based on parameter 'source'
     '''
-    
+    _registry = { 'HardyBarth': ('.wallbox.hardybarth', 'HardyBarth'),                   # lazy imports - dummy simulations don't load requests
+                  'dummy'     : ('.wallbox.wbtemplate', 'DummyWB') }
+
     def getWallBox(self, name, config):
-        wallbox   = None
-        if   name == 'HardyBarth': wallbox = HardyBarth(config)
-        elif name == 'dummy'     : wallbox = DummyWB()
-        else: raise ValueError()
-        return(wallbox)
\ No newline at end of file
+        try:
+            module, cls = self._registry[name]
+        except KeyError:
+            raise ValueError(name)
+        wallbox = getattr(import_module(module, package=__package__), cls)
+        if name == 'dummy': wallbox = wallbox()
+        else:               wallbox = wallbox(config)
+        return(wallbox)
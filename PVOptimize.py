@@ -14,13 +14,18 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-This is the main script to run PVControl from crontab. This script is 
-typically called every minute or so. By default, config.ini in the local 
-directory is the configuration file. But argument -c can specify a 
+This is the main script to run PVControl from crontab. This script is
+typically called every minute or so. By default, config.ini in the local
+directory is the configuration file. But argument -c can specify a
 different file.
+
+Alternatively, argument -d runs the script as a long-running daemon which
+executes one controller tick per interval (default: 60s). This avoids the
+per-minute interpreter and library startup cost of the crontab approach.
 """
 
 import configparser
+import functools
 import os
 import sys
 import argparse
@@ -28,44 +33,82 @@ import time
 import json
 from datetime import datetime, timezone
 
+try:
+    import orjson                                                                        # considerably faster JSON encoding, if installed
+    _orjson_installed = True
+except ImportError:
+    _orjson_installed = False
+
 from PVControl.pvcontrol import PVControl
 
+@functools.cache
 def get_script_path():
     return os.path.dirname(os.path.realpath(sys.argv[0]))
 
+def readConfig(cfgFile):
+    """
+    Reads config file 'cfgFile' and - if enabled - merges the GUI config file on top.
+    Returns the config object and the GUI path (None if GUI is disabled). Called once
+    per tick in daemon mode, so that GUI changes are picked up.
+    """
+    myConfig = configparser.ConfigParser(inline_comment_prefixes='#', empty_lines_in_values=False)
+    if not os.path.isfile(cfgFile): raise Exception (cfgFile + ' does not exist')
+    myConfig.read(cfgFile)
+    path = None
+    if myConfig['PVControl'].getboolean('enableGUI', False):
+        I_max   = myConfig['PVControl'].getfloat('I_max', None)
+        path    = myConfig['PVControl'].get('guiPath', '~/.node-red/projects/PVControl')
+        path    = os.path.expanduser(path)
+        cfgFile = path + '/gui_config.ini'
+        if not os.path.isfile(cfgFile): raise Exception (cfgFile + ' does not exist')
+        myConfig.read(cfgFile)
+        if I_max == 0:                                                                   # preserve I_max if it was zero. This disables WB controll
+            myConfig.set('PVControl', 'I_max', '0')
+    return(myConfig, path)
+
+def runOnce(myConfig, path):
+    """
+    Runs one controller tick and - if enabled - writes the GUI control file
+    """
+    print("-- " + str(datetime.now(timezone.utc)) + " - UTC")
+    myPVControl = PVControl(myConfig)
+    sysstatus   = myPVControl.runControl()
+    if path is not None:                                                                 # write out GUI control file
+        if _orjson_installed:
+            data = orjson.dumps(sysstatus, option=orjson.OPT_SERIALIZE_NUMPY, default=float)   # tolerate numpy scalars, like json.dump did
+        else:
+            data = json.dumps(sysstatus, separators=(',', ':')).encode()
+        tmpFile = path + '/pvstatus.json.tmp'
+        with open(tmpFile, 'wb') as json_file:                                           # compact JSON, swapped in atomically - GUI never sees a partial file
+            json_file.write(data)
+        os.replace(tmpFile, path + '/pvstatus.json')
+    del myPVControl
+
 if __name__ == "__main__":
     cfgParser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
     cfgParser.add_argument('-c', '--cfg', help="Specify config file (default: ./config.ini)", metavar="FILE")
+    cfgParser.add_argument('-d', '--daemon', action='store_true', help="run as daemon instead of a single (crontab) tick")
+    cfgParser.add_argument('-i', '--interval', type=int, default=60, help="daemon tick interval [s] (default: 60)")
     args = cfgParser.parse_args()
     if args.cfg: cfgFile = args.cfg
     else:        cfgFile = 'config.ini'
     cfgFile = get_script_path() + '/' + cfgFile
 
     try:
-        myConfig = configparser.ConfigParser(inline_comment_prefixes='#', empty_lines_in_values=False)
-        if not os.path.isfile(cfgFile): raise Exception (cfgFile + ' does not exist')
-        myConfig.read(cfgFile)
-        path = None
-        if myConfig['PVControl'].getboolean('enableGUI', False):
-            I_max   = myConfig['PVControl'].getfloat('I_max', None) 
-            path    = myConfig['PVControl'].get('guiPath', '~/.node-red/projects/PVControl')
-            path    = os.path.expanduser(path)
-            cfgFile = path + '/gui_config.ini'
-            if not os.path.isfile(cfgFile): raise Exception (cfgFile + ' does not exist')
-            myConfig.read(cfgFile)
-            if I_max == 0:                                                               # preserve I_max if it was zero. This disables WB controll
-                myConfig.set('PVControl', 'I_max', '0') 
+        myConfig, path = readConfig(cfgFile)
     except Exception as e:
         print('Error reading config file ' + cfgFile + ': ' + str(e))
         sys.exit(1)
 
-    runDelay    = myConfig['PVControl'].getint('run', 0)                                 # sleep to allow 'solaranzeige' to fully update Influx
-    print("-- " + str(datetime.now(timezone.utc)) + " - UTC")
-    myPVControl = PVControl(myConfig)
-    time.sleep(runDelay)
-    sysstatus   = myPVControl.runControl()
-    if path is not None:                                                                 # write out GUI control file
-        json_file = open(path + '/pvstatus.json', 'w')
-        json.dump(sysstatus, json_file, indent=4)
-        json_file.close()
-    del myPVControl
\ No newline at end of file
+    runDelay = myConfig['PVControl'].getint('run', 0)                                    # sleep to allow 'solaranzeige' to fully update Influx
+    if args.daemon:
+        while True:                                                                      # align ticks to interval boundary, then honor runDelay
+            time.sleep(args.interval - time.time() % args.interval + runDelay)
+            try:
+                myConfig, path = readConfig(cfgFile)
+                runOnce(myConfig, path)
+            except (Exception, SystemExit) as e:                                         # Kostal exits on login failure - keep ticking, like cron would
+                print('Error in control loop: ' + repr(e))
+    else:
+        time.sleep(runDelay)
+        runOnce(myConfig, path)
@@ -21,13 +21,12 @@ specify a different file.
 """
 
 import configparser
+import functools
 import os
 import sys
 import argparse
-import pandas as pd
-
-from PVControl.pvserver  import PVServer
 
+@functools.cache
 def get_script_path():
     return os.path.dirname(os.path.realpath(sys.argv[0]))
 
@@ -47,18 +46,23 @@ if __name__ == "__main__":
         print('Error reading config file ' + cfgFile + ': ' + str(e))
         sys.exit(1)
 
+    import pandas as pd                                                                  # deferred - bad args or config fail fast, without paying
+    from PVControl.pvserver import PVServer                                              # ... for the heavy pandas/matplotlib import chain
+
     myServer = PVServer(myConfig)                                                        # create PV server to emulate power distribution (bat, grid, ...)
     runCtrl  = myConfig['PVControl'].getint('run', 0)                                    # False doesn't run controller, merely creates plot files for PV system
-    if os.path.exists('./pvcontrol.pickle'):
-        os.remove('./pvcontrol.pickle')
-    summary  = pd.DataFrame()
+    for persistFile in ('./pvcontrol.json', './pvcontrol.pickle'):
+        if os.path.exists(persistFile):
+            os.remove(persistFile)
+    daySummaries = []
     for day in myServer.days:                                                            # iterate of startDate .. endDate as defined in config file
         myServer.getDayData(day)                                                         # get data for one day
         if (runCtrl != 0):
             myServer.runController()                                                     # simulate controller (eg. wallbox charging)
         daySummary = myServer.plot(runCtrl)                                              # plot data, summarize
         if daySummary is not None:
-            summary = pd.concat([summary, daySummary.to_frame().T])
+            daySummaries.append(daySummary)
+    summary  = pd.DataFrame(daySummaries)                                                # one row per day - build the frame once
     if myConfig['PVServer'].getboolean('storePNG') and not summary.empty:
         summary.index.name = 'day'
         file = myConfig['PVServer'].get('storePath') + '/' + 'summary.csv'
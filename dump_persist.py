@@ -0,0 +1,5 @@
+import json
+
+file = open('./pvcontrol.json', 'rb')
+data = json.load(file)
+print(data)
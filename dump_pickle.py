@@ -1,5 +0,0 @@
-import pickle
-
-file = open('./pvcontrol.pickle', 'rb')
-data = pickle.load(file)
-print(data)